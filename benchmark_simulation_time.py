@@ -6,6 +6,7 @@ import csv
 # Config
 SUMO_BINARY = "sumo"
 CONFIG_FILE = "base.sumocfg"
+# Sweeps delete their route files; write this one with simulation_engine.build_route_file(20, vehicles)
 ROUTE_FILE = "results/routes_sim_20.rou.xml"
 RESULT_CSV = "results-analysis-time-performance/simulation_duration_20km_int.csv"
 
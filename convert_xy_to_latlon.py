@@ -1,5 +1,5 @@
 import pandas as pd
-from sumolib.net import readNet
+from net_cache import read_net
 
 # Files
 csv_input = "results-analysis-time-performance/vehicle_positions_with_speed_2.csv"
@@ -7,7 +7,7 @@ csv_output = "results-analysis-time-performance/vehicule_latlon.csv"
 net_file = "Maps/harta-automatica.net.xml" 
 
 # Loading SUMO
-net = readNet(net_file)
+net = read_net(net_file)
 
 # Read from CSV files
 df = pd.read_csv(csv_input)
@@ -0,0 +1,124 @@
+import os
+import math
+import threading
+
+import memory_guard
+
+# Pin every SUMO worker (and the sumo child it starts) to its own core
+PIN_CPUS = os.getenv("SUMO_PIN_CPUS", "false").lower() == "true"
+# Hard cap on concurrent SUMO runs, 0 = derive from the container limits
+MAX_WORKERS = int(os.getenv("SUMO_MAX_WORKERS", "0"))
+
+
+def _cgroup_quota():
+    """
+    CPU quota of the container in cores, or None when unlimited.
+    Reads cgroup v2 (cpu.max) first, then cgroup v1 (cfs quota/period).
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus():
+    """
+    Cores this process may run on (affinity mask).
+    """
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def effective_cpus():
+    """
+    Usable concurrency: the affinity mask capped by the cgroup quota.
+    """
+    cpus = len(available_cpus())
+    quota = _cgroup_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def pool_size(tasks):
+    """
+    Number of worker processes for a sweep of `tasks` simulations.
+    """
+    workers = min(tasks, effective_cpus(), memory_guard.max_workers())
+    if MAX_WORKERS > 0:
+        workers = min(workers, MAX_WORKERS)
+    return max(1, workers)
+
+
+class CoreBudget:
+    """
+    Shares the effective cores between sweeps running at the same time
+    (scheduled job and POST handler), so together they never oversubscribe.
+    Every sweep gets specific core IDs, which its workers are pinned to.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_use = set()
+
+    def acquire(self, tasks):
+        """
+        Returns (workers, cores): the pool size and the free cores reserved
+        for it. When every core is taken the sweep still gets one worker,
+        with no reserved core (left unpinned).
+        """
+        with self.lock:
+            free = [c for c in available_cpus() if c not in self.in_use]
+            workers = max(1, min(pool_size(tasks), effective_cpus() - len(self.in_use), len(free)))
+            cores = free[:workers]
+            self.in_use.update(cores)
+            return workers, cores
+
+    def release(self, cores):
+        with self.lock:
+            self.in_use.difference_update(cores)
+
+
+BUDGET = CoreBudget()
+
+
+def concurrency_info(tasks, workers):
+    return {
+        "tasks": tasks,
+        "workers": workers,
+        "effective_cpus": effective_cpus(),
+        "affinity_cpus": len(available_cpus()),
+        "cgroup_quota": _cgroup_quota(),
+        "pinned": PIN_CPUS,
+    }
+
+
+def pin_worker(cores, counter):
+    """
+    ProcessPoolExecutor initializer: pins each worker to the next of the
+    cores reserved for its sweep. Child processes (sumo) inherit the mask.
+    """
+    with counter.get_lock():
+        slot = counter.value
+        counter.value += 1
+    try:
+        os.sched_setaffinity(0, {cores[slot % len(cores)]})
+    except (AttributeError, OSError):
+        pass
@@ -1,33 +1,161 @@
 import xml.etree.ElementTree as ET
+import argparse
+import random
 import json
-import sys
 
-def extract_osm_coords(osm_path, out_json="results-analysis-time-performance/locations_int.json", max_nodes=50):
+
+def _stream(path, tag):
+    """
+    Yields every <tag> element of a large XML file and frees it afterwards,
+    so memory stays flat regardless of the file size.
+    """
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+    depth = 1
+    for event, elem in context:
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            # a top-level element is complete: use it if wanted, then drop it
+            if elem.tag == tag:
+                yield elem
+            root.clear()
+
+
+# Vehicle class of the vType written by simulation_engine.build_route_file
+VCLASS = "delivery"
+
+
+def _lane_allows(lane, vclass=VCLASS):
+    # SUMO lane permissions: "allow" wins, else everything not in "disallow"
+    allow = lane.get("allow")
+    if allow is not None:
+        allowed = allow.split()
+        return vclass in allowed or "all" in allowed
+    disallowed = (lane.get("disallow") or "").split()
+    return vclass not in disallowed and "all" not in disallowed
+
+
+def drivable_ways(net_path):
+    """
+    OSM way ids that netconvert turned into edges of the target network
+    with at least one lane open to VCLASS, plus the network's lon/lat
+    bounding box. Edge ids look like "[-]<wayId>[#<n>]".
+    """
+    ways = set()
+    bounds = None
+    for elem in _stream(net_path, "location"):
+        bounds = [float(v) for v in elem.get("origBoundary").split(",")]
+        break
+    for elem in _stream(net_path, "edge"):
+        if elem.get("function") == "internal":
+            continue
+        if not any(_lane_allows(lane) for lane in elem.iter("lane")):
+            continue
+        way_id = elem.get("id").lstrip("-").split("#")[0]
+        if way_id.isdigit():
+            ways.add(way_id)
+    return ways, bounds
+
+
+def _reservoir_add(reservoir, seen, size, item, rng):
+    # Algorithm R: keeps a uniform sample of `size` out of `seen` items
+    if len(reservoir) < size:
+        reservoir.append(item)
+    else:
+        j = rng.randrange(seen)
+        if j < size:
+            reservoir[j] = item
+
+
+def _round_robin(reservoirs, count, rng):
+    """
+    Draws one node per way in turn (ways in random order), so short ways
+    contribute as many nodes as long ones until they run out.
+    """
+    for reservoir in reservoirs:
+        rng.shuffle(reservoir)
+    rng.shuffle(reservoirs)
+    picked = []
+    while len(picked) < count and reservoirs:
+        for reservoir in reservoirs:
+            if len(picked) == count:
+                break
+            picked.append(reservoir.pop())
+        reservoirs = [r for r in reservoirs if r]
+    return picked
+
+
+def extract_osm_coords(osm_path, net_path,
+                       out_json="results-analysis-time-performance/locations_int.json",
+                       max_nodes=50, mode="uniform", seed=None):
+    """
+    Samples max_nodes OSM nodes lying on drivable edges of net_path.
+    mode – "uniform": every candidate node equally likely
+           "stratified": nodes drawn from every drivable way in turn, so
+                         short ways are as represented as long ones
+    """
     print("osm_file", osm_path)
-    tree = ET.parse(osm_path)
-    root = tree.getroot()
+    rng = random.Random(seed)
+    ways, bounds = drivable_ways(net_path)
 
-    coords = []
-    for node in root.findall("node"):
-        if len(coords) >= max_nodes:
-            break
+    # Pass 1: node refs of drivable ways (nodes precede ways in .osm files)
+    node_way = {}
+    for way in _stream(osm_path, "way"):
+        way_id = way.get("id")
+        if way_id not in ways:
+            continue
+        for nd in way.iter("nd"):
+            node_way.setdefault(nd.get("ref"), way_id)
+
+    # Pass 2: sample the referenced nodes inside the network boundary,
+    # one reservoir for all (uniform) or one per way (stratified)
+    reservoirs = {}
+    seen = {}
+    for node in _stream(osm_path, "node"):
+        way_id = node_way.get(node.get("id"))
+        if way_id is None:
+            continue
         lat = node.get("lat")
         lon = node.get("lon")
         if lat is None or lon is None:
             continue
-        coords.append({"ox": lat, "oy": lon})
+        if bounds and not (bounds[0] <= float(lon) <= bounds[2] and bounds[1] <= float(lat) <= bounds[3]):
+            continue
+        # ox is the longitude and oy the latitude, as build_route_file reads them
+        coord = {"ox": lon, "oy": lat}
+        key = way_id if mode == "stratified" else None
+        seen[key] = seen.get(key, 0) + 1
+        _reservoir_add(reservoirs.setdefault(key, []), seen[key], max_nodes, coord, rng)
 
-    if not coords:
+    candidates = [c for r in reservoirs.values() for c in r]
+    if not candidates:
         print("⚠️  No valid nodes found in", osm_path)
         return
 
+    if mode == "stratified":
+        coords = _round_robin(list(reservoirs.values()), max_nodes, rng)
+    else:
+        coords = rng.sample(candidates, min(max_nodes, len(candidates)))
+    if len(coords) < max_nodes:
+        # Fewer distinct nodes than vehicles: repeat positions for load tests
+        print(f"⚠️  Only {len(candidates)} distinct nodes, sampling with replacement")
+        coords += [rng.choice(candidates) for _ in range(max_nodes - len(coords))]
+
     with open(out_json, "w", encoding="utf-8") as f:
         json.dump(coords, f, indent=2)
 
     print(f"✅  Extracted {len(coords)} coords → {out_json}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python extract_coords.py")
-        sys.exit(1)
-    extract_osm_coords(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Sample vehicle locations from an .osm file")
+    parser.add_argument("osm_file")
+    parser.add_argument("net_file", help=".net.xml whose drivable edges the nodes must lie on")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--mode", choices=("uniform", "stratified"), default="uniform")
+    parser.add_argument("--out", default="results-analysis-time-performance/locations_int.json")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    extract_osm_coords(args.osm_file, args.net_file, args.out, args.count, args.mode, args.seed)
@@ -6,9 +6,10 @@ import requests
 from datetime import datetime
 from pymongo import MongoClient
 import traci
-import sumolib
 import xml.etree.ElementTree as ET
 
+from net_cache import read_net
+
 # Config
 MONGO_URI = "mongodb://localhost:27018"
 POST_URL = "http://localhost:5000/updateVehicle"
@@ -25,7 +26,7 @@ EXTRA_KMH = 20
 if "SUMO_HOME" not in os.environ:
     sys.exit("❌ Please declare SUMO_HOME environment variable.")
 
-net = sumolib.net.readNet(NET_FILE)
+net = read_net(NET_FILE)
 mongo_client = MongoClient(MONGO_URI)
 vehicles_col = mongo_client[DB_NAME][COLLECTION_NAME]
 clients = list(vehicles_col.find({}, {"_id": 0}))
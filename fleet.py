@@ -0,0 +1,32 @@
+# Only what a sweep needs from a vehicle document; token, heading,
+# destination and the stored recommendations stay in Mongo.
+FLEET_PROJECTION = {"_id": 0, "id": 1, "location.ox": 1, "location.oy": 1, "GPSSpeed": 1}
+
+
+class Vehicle:
+    """
+    Compact in-memory vehicle for sweeps over large fleets.
+    """
+    __slots__ = ("id", "lon", "lat", "gps_speed")
+
+    def __init__(self, vid, lon, lat, gps_speed):
+        self.id = vid
+        self.lon = lon
+        self.lat = lat
+        self.gps_speed = gps_speed
+
+    @classmethod
+    def from_doc(cls, doc):
+        # location.ox is the longitude, location.oy the latitude
+        return cls(doc["id"],
+                   float(doc["location"]["ox"]),
+                   float(doc["location"]["oy"]),
+                   float(doc.get("GPSSpeed", 0)))
+
+
+def compact(clients):
+    """
+    Vehicles from vehicle dicts (e.g. /simulationData in gui.py);
+    Vehicle instances pass through unchanged.
+    """
+    return [c if isinstance(c, Vehicle) else Vehicle.from_doc(c) for c in clients]
@@ -28,17 +28,24 @@ if not coords or len(coords) < 1:
     raise ValueError("Coordinate list is empty.")
 
 last_speed = None
+last_etag = None
 
 while True:
     try:
-        # Get current recommendation
-        res = requests.get(f"{API_URL}/simulationData", timeout=5)
+        # Get current recommendation (304 while nothing changed on the server)
+        headers = {"If-None-Match": last_etag} if last_etag else {}
+        res = requests.get(f"{API_URL}/simulationData", headers=headers, timeout=5)
+        if res.status_code == 304:
+            print(f"[GUI] No change in recommendedSpeed: still {last_speed}")
+            time.sleep(POLL_INTERVAL)
+            continue
         if res.status_code != 200:
             print(f"[GUI] Server error: {res.status_code}")
             time.sleep(POLL_INTERVAL)
             continue
 
         data = res.json()
+        last_etag = res.headers.get("ETag")
         rec_speed = data.get("recommendedSpeed")
         if rec_speed is None:
             print("[GUI] No recommendation yet.")
@@ -51,7 +58,7 @@ while True:
             last_speed = rec_speed
 
             # Regenerate route file
-            vehicles = requests.get(f"{API_URL}/simulationData").json().get("vehicles", [])
+            vehicles = data.get("vehicles", [])
             speed_int = int(rec_speed.replace(" km/h", ""))
             route_file = build_route_file(speed_int, vehicles)
             print(f"[GUI] Generated {len(vehicles)} vehicles @ {rec_speed} → {route_file}")
@@ -0,0 +1,9 @@
+import os
+
+# Production HTTP serving of headless.py: gunicorn -c gunicorn.conf.py headless:app
+# Sweeps run in sweep_service.py, so HTTP workers scale independently.
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+threads = int(os.getenv("WEB_THREADS", "4"))
+timeout = 120
+raw_env = ["SWEEP_MODE=" + os.getenv("SWEEP_MODE", "dedicated")]
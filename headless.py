@@ -1,11 +1,20 @@
 import os
+import json
+import time
 import datetime
-from flask import Flask, request, jsonify
+import threading
+import contextlib
+from flask import Flask, Response, request, jsonify
 from apscheduler.schedulers.background import BackgroundScheduler
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
 from simulation_engine import run_simulations
+from response_cache import ResponseCache
+from fleet import FLEET_PROJECTION, Vehicle
+from leader_lease import LeaderLease
+from sweep_profiler import SWEEP_PROFILE, SweepProfile
+from replan_controller import MIN_INTERVAL, ReplanController
 
 # Performance Monitoring
 from performance_monitor import PerformanceMonitor
@@ -20,38 +29,215 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 mongo_client = MongoClient(MONGO_URI)
 db = mongo_client["traffic_db"]
 vehicles_col = db["vehicles"]
+meta_col = db["meta"]
+leases_col = db["leases"]
 
-def scheduled_run():
+# Serialized /simulationData responses, valid until the fleet version changes
+response_cache = ResponseCache()
+
+# Vehicle fields /simulationData may return (?fields=...), as stored by /updateVehicle
+VEHICLE_FIELDS = {"id", "token", "destination", "GPSSpeed", "OBD2Speed", "localTimestamp",
+                  "heading", "location", "recommendedSpeed", "approachSpeeds", "lastSimulation"}
+
+# Rank speeds with a cheap screening pass and re-run only the best at full fidelity
+SIM_SCREENING = os.getenv("SIM_SCREENING", "false").lower() == "true"
+# Answer from the learned surrogate when confident, sweep with SUMO otherwise
+SURROGATE_FIRST = os.getenv("SURROGATE_FIRST", "false").lower() == "true"
+# Fork every candidate speed from one saved SUMO state
+SIM_WARM_START = os.getenv("SIM_WARM_START", "false").lower() == "true"
+
+# "inline": sweeps run in the HTTP process(es), as with `python headless.py`
+# "dedicated": HTTP only, sweeps run in sweep_service.py
+SWEEP_MODE = os.getenv("SWEEP_MODE", "inline")
+# Only one process (HTTP worker or sweep service) sweeps at a time
+sweep_lease = LeaderLease(leases_col, "sweeper", ttl=int(os.getenv("SWEEP_LEASE_TTL", "300")))
+
+# Sizes and spaces sweeps to fit the latency SLO (in both sweep modes)
+controller = ReplanController()
+# Start time and fleet update count of the last sweep, for the fleet churn
+last_sweep = {"time": float("-inf"), "updates": 0}
+# Held while this process sweeps inline; requests meanwhile coalesce
+sweeping = threading.Lock()
+
+# Required by the /admin endpoints, which are disabled without it
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def bump_fleet_version(vehicle_update=False):
+    """
+    Invalidates cached responses (in every HTTP worker) after the fleet
+    or its recommendation changed. Vehicle updates are also counted,
+    which is the fleet churn the sweep service plans with.
+    """
+    inc = {"version": 1, "updates": 1} if vehicle_update else {"version": 1}
+    meta_col.update_one({"_id": "fleet"}, {"$inc": inc}, upsert=True)
+
+def fleet_version():
+    doc = meta_col.find_one({"_id": "fleet"}, {"version": 1})
+    return doc["version"] if doc else 0
+
+def fetch_clients():
     """
-    This job runs once per minute in the background,
-    simulates all vehicles, and writes recommendedSpeed + lastSimulation.
+    Only the fields a sweep needs, converted document by document to
+    compact Vehicles so the full documents are never all held at once.
     """
     monitor.mark_db_fetch_start()
-    clients = list(vehicles_col.find({}, {"_id": 0}))
+    clients = [Vehicle.from_doc(doc) for doc in vehicles_col.find({}, FLEET_PROJECTION)]
     monitor.mark_db_fetch_end(len(clients))
+    return clients
 
+def run_and_store(trigger, lease=None, **sweep_options):
+    """
+    Simulates all vehicles and writes recommendedSpeed + lastSimulation.
+    lease         – LeaderLease the sweep runs under: renewed while it runs,
+                    results are discarded if it was lost meanwhile
+    sweep_options – extra run_simulations arguments (horizon, speed_step)
+    Returns (sim, timestamp), or None when there are no vehicles
+    or the lease was lost.
+    """
+    clients = fetch_clients()
     if not clients:
-        return
+        return None
 
-    monitor.mark_simulation_start("scheduled_run")
-    sim = run_simulations(clients)
+    profiler = SweepProfile("results") if SWEEP_PROFILE or take_profile_request() else None
+
+    monitor.mark_simulation_start(trigger)
+    with lease.keep_alive() if lease else contextlib.nullcontext(), \
+            profiler or contextlib.nullcontext():
+        sim = run_simulations(clients, screen=SIM_SCREENING,
+                              surrogate_first=SURROGATE_FIRST,
+                              warm_start=SIM_WARM_START,
+                              profile_dir=profiler.dir if profiler else None,
+                              **sweep_options)
+    monitor.annotate_simulation(source=sim.get("source"),
+                                concurrency=sim.get("concurrency"),
+                                memory=sim.get("memory"),
+                                screening=sim.get("screening"),
+                                options=sweep_options,
+                                profile=profiler.report if profiler else None)
     monitor.mark_simulation_end()
 
-    rec_speed = sim["recommendedSpeed"]
+    if lease is not None and not lease.held():
+        # Another process took over and sweeps now; do not race its results
+        print(f"⚠️  [{trigger}] Sweep lease lost, discarding this sweep's results")
+        monitor.finalize("results")
+        return None
+
     ts = datetime.datetime.utcnow().isoformat() + "Z"
 
-    vehicles_col.update_many(
-        {}, 
-        {"$set": {"recommendedSpeed": rec_speed,
-                  "lastSimulation": ts}}
-    )
+    # Store the new recommendation & timestamp
+    update = {"recommendedSpeed": sim["recommendedSpeed"], "lastSimulation": ts}
+    # Only SUMO sweeps yield per-approach speeds; keep the last ones otherwise
+    if sim.get("source") == "sumo":
+        update["approachSpeeds"] = sim.get("approachSpeeds", {})
+    vehicles_col.update_many({}, {"$set": update})
+    bump_fleet_version()
 
     monitor.finalize("results")
+    return sim, ts
+
+def fleet_updates():
+    doc = meta_col.find_one({"_id": "fleet"}, {"updates": 1}) or {}
+    return doc.get("updates", 0)
+
+def fleet_churn():
+    """
+    Share of the fleet updated since the last sweep started.
+    """
+    updates = fleet_updates() - last_sweep["updates"]
+    return updates / max(vehicles_col.estimated_document_count(), 1)
+
+def planned_run(trigger, lease=None):
+    """
+    Runs one sweep sized by the controller and feeds its latency back.
+    Returns run_and_store's result.
+    """
+    plan = controller.plan()
+    if controller.overloaded:
+        print(f"[SWEEP] ⚠️ Over the {controller.slo:.0f} s SLO even degraded, "
+              f"using horizon={plan['horizon']:.0f} s, step={plan['speed_step']} km/h")
+
+    last_sweep.update(time=time.monotonic(), updates=fleet_updates())
+    out = run_and_store(trigger, lease=lease,
+                        horizon=plan["horizon"], speed_step=plan["speed_step"])
+    latency = time.monotonic() - last_sweep["time"]
+
+    # Surrogate answers say nothing about SUMO cost
+    if out and out[0].get("source") == "sumo":
+        controller.record(plan, latency, out[0].get("concurrency"))
+    print(f"[SWEEP] {trigger}: {latency:.1f} s (horizon={plan['horizon']:.0f} s, "
+          f"step={plan['speed_step']} km/h, predicted={plan['predictedLatency']})")
+    return out
+
+def request_sweep():
+    """
+    Asks for a sweep (sweep_service.py, or the inline scheduler);
+    repeated requests coalesce into one.
+    """
+    meta_col.update_one({"_id": "fleet"}, {"$set": {"sweepRequested": True}}, upsert=True)
+
+def take_sweep_request():
+    """
+    Atomically consumes the flag set by request_sweep().
+    """
+    doc = meta_col.find_one_and_update(
+        {"_id": "fleet", "sweepRequested": True},
+        {"$set": {"sweepRequested": False}}
+    )
+    return doc is not None
+
+def take_profile_request():
+    """
+    Atomically consumes the one-shot flag set by POST /admin/profile,
+    so the next sweep (in whichever process runs it) is profiled.
+    """
+    doc = meta_col.find_one_and_update(
+        {"_id": "fleet", "profileNext": True},
+        {"$set": {"profileNext": False}}
+    )
+    return doc is not None
+
+def scheduled_run():
+    """
+    This job checks every MIN_INTERVAL seconds for queued requests and
+    whether the controller's interval for the current fleet churn has
+    passed. Every HTTP worker schedules it, but only the holder of the
+    Mongo lease actually sweeps.
+    """
+    if not sweep_lease.acquire():
+        return
+    if not sweeping.acquire(blocking=False):
+        return
+    try:
+        since = time.monotonic() - last_sweep["time"]
+        requested = since >= controller.min_gap() and take_sweep_request()
+        if requested or since >= controller.interval(fleet_churn()):
+            planned_run("POST_updateVehicle" if requested else "scheduled_run", lease=sweep_lease)
+    finally:
+        sweeping.release()
 
-# Start the background scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(scheduled_run, "interval", minutes=1)
-scheduler.start()
+def inline_run(trigger):
+    """
+    Sweeps right away in this process unless a sweep is running here,
+    controller.min_gap() has not passed or another process holds the
+    sweep lease. Returns planned_run's result, or None if the request
+    should be queued instead.
+    """
+    if time.monotonic() - last_sweep["time"] < controller.min_gap():
+        return None
+    if not sweep_lease.acquire():
+        return None
+    if not sweeping.acquire(blocking=False):
+        return None
+    try:
+        return planned_run(trigger, lease=sweep_lease)
+    finally:
+        sweeping.release()
+
+# In inline mode start the background scheduler in this process
+if SWEEP_MODE == "inline":
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(scheduled_run, "interval", seconds=MIN_INTERVAL)
+    scheduler.start()
 
 # API endpoint to upsert vehicle payloads
 @app.route("/updateVehicle", methods=["POST"])
@@ -77,50 +263,127 @@ def update_vehicle():
 
     # Upsert this one vehicle
     vehicles_col.update_one({"id": vid}, {"$set": clean}, upsert=True)
+    bump_fleet_version(vehicle_update=True)
 
-    # Re‐run all simulations immediately
-    monitor.mark_db_fetch_start()
-    clients = list(vehicles_col.find({}, {"_id": 0}))
-    monitor.mark_db_fetch_end(len(clients))
+    # Inline mode sweeps right away unless one is running or ran too recently
+    out = inline_run("POST_updateVehicle") if SWEEP_MODE == "inline" else None
+    if out is None:
+        # The sweep service (or the inline scheduler) picks this up;
+        # answer with the last recommendation
+        request_sweep()
+        rec = vehicles_col.find_one(
+            {"id": vid},
+            {"_id": 0, "recommendedSpeed": 1, "approachSpeeds": 1, "lastSimulation": 1}
+        ) or {}
+        return jsonify({
+            "lastUpdated": rec.get("lastSimulation"),
+            "message": "Vehicle data updated, simulation queued",
+            "recommendedSpeed": rec.get("recommendedSpeed"),
+            "approachSpeeds": rec.get("approachSpeeds", {})
+        }), 200
 
-    monitor.mark_simulation_start("POST_updateVehicle")
-    sim = run_simulations(clients)
-    monitor.mark_simulation_end()
-
-    rec_speed = sim["recommendedSpeed"]
-    ts = datetime.datetime.utcnow().isoformat() + "Z"
-
-    # Store the new recommendation & timestamp
-    vehicles_col.update_many(
-        {},
-        {"$set": {"recommendedSpeed": rec_speed,
-                  "lastSimulation": ts}}
-    )
-
-    monitor.finalize("results")
+    sim, ts = out
+    approach_speeds = sim.get("approachSpeeds", {})
+    if sim.get("source") != "sumo":
+        # The surrogate gives no per-approach speeds, the last SUMO ones still apply
+        rec = vehicles_col.find_one({"id": vid}, {"_id": 0, "approachSpeeds": 1}) or {}
+        approach_speeds = rec.get("approachSpeeds", {})
 
     # Respond with the exact format you specified
     return jsonify({
         "lastUpdated": ts,
         "message": "Vehicle data updated",
-        "recommendedSpeed": rec_speed
+        "recommendedSpeed": sim["recommendedSpeed"],
+        "approachSpeeds": approach_speeds
     }), 200
 
+@app.route("/admin/profile", methods=["POST"])
+def profile_next_sweep():
+    """
+    Profiles the next sweep; the merged report is written to
+    results/profile_<timestamp>.txt next to the performance JSON.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Profiling disabled, ADMIN_TOKEN is not set"}), 404
+    if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    meta_col.update_one({"_id": "fleet"}, {"$set": {"profileNext": True}}, upsert=True)
+    return jsonify({"message": "Next sweep will be profiled"}), 202
+
 @app.route("/simulationData", methods=["GET"])
 def simulation_data():
     """
-    Return the current recommendedSpeed plus the full list of vehicles
+    Return the current recommendedSpeed, the per-approach speeds
+    (entry edge -> speed) plus the full list of vehicles
     in exactly the structure gui.py expects.
+
+    Optional query parameters:
+      fields – comma-separated vehicle fields to return (e.g. id,location)
+      offset, limit – page through the vehicle list
+
+    Responses are cached per fleet version and carry an ETag;
+    polling with If-None-Match costs a 304 while nothing changed.
     """
-    vehicles = list(vehicles_col.find({}, {"_id": 0}))
-    if not vehicles:
-        return jsonify({"error": "No vehicles in database"}), 404
+    # Unknown fields (and _id, an ObjectId) are ignored; sorted for the cache key
+    fields = {f.strip() for f in request.args.get("fields", "").split(",")
+              if f.strip().split(".")[0] in VEHICLE_FIELDS}
+    # A sub-path of a requested field is already included (and would make
+    # the Mongo projection collide): "location,location.ox" -> "location"
+    fields = tuple(sorted(f for f in fields
+                          if not any(f.startswith(p + ".") for p in fields)))
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = request.args.get("limit")
+        limit = max(int(limit), 0) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
 
-    rec_speed = vehicles[0].get("recommendedSpeed")
-    return jsonify({
-        "recommendedSpeed": rec_speed,
-        "vehicles": vehicles
-    }), 200
+    version = fleet_version()
+    key = (fields, offset, limit)
+    entry = response_cache.get(version, key)
+    if entry is None:
+        body, status = _serialize_simulation_data(fields, offset, limit)
+        entry = response_cache.put(version, key, body, status)
+
+    # Strong ETags differ per content encoding; either form of the current
+    # version validates, the 304 carries the one for this request's encoding
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = entry["etag"] + ("-gzip" if use_gzip else "")
+    headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding"}
+    if entry["etag"] in request.if_none_match or entry["etag"] + "-gzip" in request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    body = entry["body"]
+    if use_gzip:
+        body = ResponseCache.gzipped(entry)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, status=entry["status"], headers=headers,
+                    mimetype="application/json")
+
+def _serialize_simulation_data(fields, offset, limit):
+    rec = vehicles_col.find_one({}, {"_id": 0, "recommendedSpeed": 1, "approachSpeeds": 1})
+    if rec is None:
+        return json.dumps({"error": "No vehicles in database"}).encode(), 404
+
+    projection = {"_id": 0}
+    for field in fields:
+        projection[field] = 1
+
+    cursor = vehicles_col.find({}, projection)
+    payload = {
+        "recommendedSpeed": rec.get("recommendedSpeed"),
+        "approachSpeeds": rec.get("approachSpeeds", {}),
+    }
+    if offset or limit is not None:
+        if limit == 0:
+            # pymongo's limit(0) means "no limit": an explicit 0 is an empty page
+            cursor = []
+        else:
+            cursor = cursor.sort("_id", 1).skip(offset).limit(limit or 0)
+        payload.update({"offset": offset, "limit": limit,
+                        "total": vehicles_col.count_documents({})})
+    payload["vehicles"] = list(cursor)
+    return json.dumps(payload).encode(), 200
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=False, use_reloader=False)
@@ -0,0 +1,75 @@
+import os
+import socket
+import datetime
+import threading
+import contextlib
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Identifies this process among every worker/replica competing for a lease
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLease:
+    """
+    Mongo-backed lease: at most one process holds `name` at a time.
+    The holder must renew it before `ttl` seconds pass, otherwise another
+    process takes over.
+    """
+
+    def __init__(self, collection, name, ttl=90):
+        self.collection = collection
+        self.name = name
+        self.ttl = datetime.timedelta(seconds=ttl)
+
+    def acquire(self):
+        """
+        Takes or renews the lease. Returns True if this process holds it.
+        """
+        now = datetime.datetime.utcnow()
+        try:
+            self.collection.find_one_and_update(
+                {"_id": self.name,
+                 "$or": [{"holder": HOLDER_ID}, {"expiresAt": {"$lt": now}}]},
+                {"$set": {"holder": HOLDER_ID, "expiresAt": now + self.ttl}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            # Held by someone else and not expired: the upsert hit the _id
+            return False
+
+    def release(self):
+        self.collection.delete_one({"_id": self.name, "holder": HOLDER_ID})
+
+    def held(self):
+        """
+        True if this process still holds an unexpired lease.
+        """
+        now = datetime.datetime.utcnow()
+        return self.collection.find_one(
+            {"_id": self.name, "holder": HOLDER_ID, "expiresAt": {"$gt": now}}
+        ) is not None
+
+    @contextlib.contextmanager
+    def keep_alive(self):
+        """
+        Renews the lease every ttl/3 from a heartbeat thread while the
+        block runs, so work longer than ttl keeps it.
+        """
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl.total_seconds() / 3):
+                if not self.acquire():
+                    print(f"⚠️  Lost lease '{self.name}' to another process")
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,119 @@
+import os
+import threading
+import psutil
+
+# Peak RSS allowed for a sweep (parent + workers + sumo), 0 = no cap
+SWEEP_RSS_LIMIT_MB = float(os.getenv("SWEEP_RSS_LIMIT_MB", "0"))
+SAMPLE_INTERVAL = 0.2  # s
+# Conservative worker size (python + sumo) before any sweep was measured
+WORKER_BASE_MB = 150.0
+WORKER_MB_PER_VEHICLE = 0.05
+
+# Largest RSS one worker (with its sumo child) reached so far, learned from
+# sweeps, and the fleet size it was measured with
+_worker_peak_mb = None
+_peak_fleet_size = 0
+# Fleet size of the sweep being run
+_fleet_size = 0
+
+
+def _tree_rss_mb(proc):
+    """
+    RSS of a process and all its descendants, in MB.
+    """
+    total = 0
+    try:
+        total += proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+    except psutil.Error:
+        pass
+    return total / 2**20
+
+
+def worker_mb():
+    """
+    Expected RSS of one worker for the current fleet: the peak of earlier
+    sweeps scaled up to a larger fleet, or an estimate from the fleet size.
+    """
+    if _worker_peak_mb is None:
+        return WORKER_BASE_MB + WORKER_MB_PER_VEHICLE * _fleet_size
+    return _worker_peak_mb * max(1.0, _fleet_size / max(_peak_fleet_size, 1))
+
+
+def max_workers():
+    """
+    Workers that fit SWEEP_RSS_LIMIT_MB, given this process's RSS and the
+    expected size of one worker.
+    """
+    if SWEEP_RSS_LIMIT_MB <= 0:
+        return float("inf")
+    parent_mb = psutil.Process().memory_info().rss / 2**20
+    return max(1, int((SWEEP_RSS_LIMIT_MB - parent_mb) // worker_mb()))
+
+
+def over_limit():
+    """
+    True while this process tree uses more than SWEEP_RSS_LIMIT_MB;
+    the local executor then starts no further runs until some finish.
+    """
+    return SWEEP_RSS_LIMIT_MB > 0 and _tree_rss_mb(psutil.Process()) > SWEEP_RSS_LIMIT_MB
+
+
+class RssWatcher:
+    """
+    Samples the RSS of this process tree during a sweep of `fleet_size`
+    vehicles and records the total peak and the largest single-worker peak.
+    """
+
+    def __init__(self, fleet_size=0, interval=SAMPLE_INTERVAL):
+        self.fleet_size = fleet_size
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_mb = 0.0
+        self.worker_peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        total = _tree_rss_mb(self.process)
+        self.peak_mb = max(self.peak_mb, total)
+        try:
+            children = self.process.children()
+        except psutil.Error:
+            children = []
+        for child in children:
+            self.worker_peak_mb = max(self.worker_peak_mb, _tree_rss_mb(child))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        global _fleet_size
+        _fleet_size = self.fleet_size
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        global _worker_peak_mb, _peak_fleet_size
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if self.worker_peak_mb and self.worker_peak_mb >= (_worker_peak_mb or 0.0):
+            _worker_peak_mb = self.worker_peak_mb
+            _peak_fleet_size = self.fleet_size
+        if SWEEP_RSS_LIMIT_MB > 0 and self.peak_mb > SWEEP_RSS_LIMIT_MB:
+            print(f"⚠️  Sweep peaked at {self.peak_mb:.0f} MB, over the "
+                  f"{SWEEP_RSS_LIMIT_MB:.0f} MB cap; the next sweep uses fewer workers")
+        return False
+
+    def stats(self):
+        return {"peakRssMb": round(self.peak_mb, 1),
+                "workerPeakRssMb": round(self.worker_peak_mb, 1),
+                "rssLimitMb": SWEEP_RSS_LIMIT_MB or None}
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import glob
+import xml.etree.ElementTree as ET
+import numpy as np
+
+# Preprocessed networks live next to their source: Maps/x.net.xml -> Maps/x.netcache/
+CACHE_SUFFIX = ".netcache"
+CACHE_VERSION = 1
+
+
+def cache_dir(net_file):
+    return net_file[:-len(".net.xml")] + CACHE_SUFFIX if net_file.endswith(".net.xml") \
+        else net_file + CACHE_SUFFIX
+
+
+def _source_stamp(net_file):
+    st = os.stat(net_file)
+    return {"size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def _read_location(net_file):
+    # <location> is the first child of <net>, stop parsing right there
+    for _, elem in ET.iterparse(net_file, events=("start",)):
+        if elem.tag == "location":
+            return dict(elem.attrib)
+    return {}
+
+
+def build_cache(net_file):
+    """
+    Converts a .net.xml once into memory-mappable arrays:
+    edge geometry, segment table, lengths, successor lists and projection.
+    """
+    import sumolib
+
+    net = sumolib.net.readNet(net_file)
+    edges = net.getEdges()
+    index = {e.getID(): i for i, e in enumerate(edges)}
+
+    shape_offsets = [0]
+    points = []
+    segments = []
+    seg_edge = []
+    seg_start = []
+    succ_offsets = [0]
+    succ_indices = []
+    for i, edge in enumerate(edges):
+        shape = edge.getShape()
+        points.extend(shape)
+        shape_offsets.append(len(points))
+
+        # Same skipping rule as the departPos loop in simulation_engine
+        s_accum = 0.0
+        for (x1, y1), (x2, y2) in zip(shape, shape[1:]):
+            seg_len = ((x2 - x1)**2 + (y2 - y1)**2)**0.5
+            if seg_len < 1e-6:
+                continue
+            segments.append((x1, y1, x2, y2))
+            seg_edge.append(i)
+            seg_start.append(s_accum)
+            s_accum += seg_len
+
+        for out in edge.getToNode().getOutgoing():
+            if out.getID() in index:
+                succ_indices.append(index[out.getID()])
+        succ_offsets.append(len(succ_indices))
+
+    out_dir = cache_dir(net_file)
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "points.npy"), np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    np.save(os.path.join(out_dir, "shape_offsets.npy"), np.asarray(shape_offsets, dtype=np.int64))
+    np.save(os.path.join(out_dir, "segments.npy"), np.asarray(segments, dtype=np.float64).reshape(-1, 4))
+    np.save(os.path.join(out_dir, "seg_edge.npy"), np.asarray(seg_edge, dtype=np.int32))
+    np.save(os.path.join(out_dir, "seg_start.npy"), np.asarray(seg_start, dtype=np.float64))
+    np.save(os.path.join(out_dir, "lengths.npy"), np.asarray([e.getLength() for e in edges], dtype=np.float64))
+    np.save(os.path.join(out_dir, "succ_offsets.npy"), np.asarray(succ_offsets, dtype=np.int64))
+    np.save(os.path.join(out_dir, "succ_indices.npy"), np.asarray(succ_indices, dtype=np.int32))
+
+    location = _read_location(net_file)
+    meta = {
+        "version": CACHE_VERSION,
+        "source": _source_stamp(net_file),
+        "edge_ids": [e.getID() for e in edges],
+        "netOffset": [float(v) for v in location.get("netOffset", "0,0").split(",")],
+        "projParameter": location.get("projParameter", "!"),
+        "convBoundary": location.get("convBoundary"),
+        "origBoundary": location.get("origBoundary"),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    print(f"✅  {net_file} → {out_dir} ({len(edges)} edges, {len(segments)} segments)")
+    return out_dir
+
+
+class CachedNode:
+    def __init__(self, net, edge_index):
+        self._net = net
+        self._edge_index = edge_index
+
+    def getOutgoing(self):
+        net = self._net
+        lo, hi = net.succ_offsets[self._edge_index], net.succ_offsets[self._edge_index + 1]
+        return [CachedEdge(net, int(i)) for i in net.succ_indices[lo:hi]]
+
+
+class CachedEdge:
+    """
+    The subset of sumolib's Edge API the engine and scripts use.
+    """
+
+    def __init__(self, net, index):
+        self._net = net
+        self.index = index
+
+    def getID(self):
+        return self._net.edge_ids[self.index]
+
+    def getLength(self):
+        return float(self._net.lengths[self.index])
+
+    def getShape(self):
+        lo, hi = self._net.shape_offsets[self.index], self._net.shape_offsets[self.index + 1]
+        return [tuple(p) for p in self._net.points[lo:hi].tolist()]
+
+    def getToNode(self):
+        # Only getOutgoing() is needed: the cache stores successors per edge
+        return CachedNode(self._net, self.index)
+
+
+class CachedNet:
+    """
+    Read-only, memory-mapped network. Worker processes loading the same
+    cache share its pages instead of each holding a parsed XML tree.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.edge_ids = meta["edge_ids"]
+        self.net_offset = meta["netOffset"]
+        self.proj_parameter = meta["projParameter"]
+        self._proj = None
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.points = load("points")
+        self.shape_offsets = load("shape_offsets")
+        self.segments = load("segments")
+        self.seg_edge = load("seg_edge")
+        self.seg_start = load("seg_start")
+        self.lengths = load("lengths")
+        self.succ_offsets = load("succ_offsets")
+        self.succ_indices = load("succ_indices")
+
+    def _projection(self):
+        if self._proj is None:
+            if self.proj_parameter == "!":
+                raise RuntimeError("Network does not provide geo-projection.")
+            import pyproj
+            self._proj = pyproj.Proj(projparams=self.proj_parameter)
+        return self._proj
+
+    def convertLonLat2XY(self, lon, lat):
+        x, y = self._projection()(lon, lat)
+        return x + self.net_offset[0], y + self.net_offset[1]
+
+    def convertXY2LonLat(self, x, y):
+        return self._projection()(x - self.net_offset[0], y - self.net_offset[1], inverse=True)
+
+    def getEdges(self):
+        return [CachedEdge(self, i) for i in range(len(self.edge_ids))]
+
+    def _segment_distances(self, x, y):
+        seg = self.segments
+        x1, y1, x2, y2 = seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3]
+        dx, dy = x2 - x1, y2 - y1
+        t = np.clip(((x - x1)*dx + (y - y1)*dy) / (dx*dx + dy*dy), 0.0, 1.0)
+        px, py = x1 + t*dx, y1 + t*dy
+        return np.hypot(x - px, y - py), px, py
+
+    def getNeighboringEdges(self, x, y, r=0.1):
+        """
+        [(edge, distance)] for every edge with a segment within r, nearest first.
+        """
+        d, _, _ = self._segment_distances(x, y)
+        hits = np.nonzero(d <= r)[0]
+        best = {}
+        for s in hits[np.argsort(d[hits], kind="stable")]:
+            best.setdefault(int(self.seg_edge[s]), float(d[s]))
+        return [(CachedEdge(self, i), dist) for i, dist in best.items()]
+
+    def getNearestEdge(self, x, y):
+        if len(self.segments) == 0:
+            return None
+        d, _, _ = self._segment_distances(x, y)
+        return CachedEdge(self, int(self.seg_edge[int(np.argmin(d))]))
+
+    def locate(self, x, y):
+        """
+        Nearest edge and the position along it, in one vectorized pass.
+        Returns (edge, pos) or None.
+        """
+        if len(self.segments) == 0:
+            return None
+        d, px, py = self._segment_distances(x, y)
+        s = int(np.argmin(d))
+        edge = CachedEdge(self, int(self.seg_edge[s]))
+        pos = float(self.seg_start[s] + np.hypot(px[s] - self.segments[s, 0], py[s] - self.segments[s, 1]))
+        return edge, pos
+
+
+def is_fresh(net_file):
+    meta_path = os.path.join(cache_dir(net_file), "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+    return meta.get("version") == CACHE_VERSION and meta.get("source") == _source_stamp(net_file)
+
+
+def read_net(net_file):
+    """
+    The preprocessed network when its cache is up to date,
+    otherwise a regular sumolib parse.
+    """
+    if is_fresh(net_file):
+        return CachedNet(cache_dir(net_file))
+    import sumolib
+    return sumolib.net.readNet(net_file)
+
+
+if __name__ == "__main__":
+    # Usage: python net_cache.py [Maps/*.net.xml ...]
+    targets = sys.argv[1:] or sorted(glob.glob("Maps/*.net.xml"))
+    for target in targets:
+        if is_fresh(target):
+            print(f"✔️  {target} is up to date")
+            continue
+        build_cache(target)
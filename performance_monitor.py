@@ -30,6 +30,9 @@ class PerformanceMonitor:
     def mark_simulation_start(self, speed):
         self.current_sim = {"speed": speed, "start": time.perf_counter()}
 
+    def annotate_simulation(self, **fields):
+        self.current_sim.update(fields)
+
     def mark_simulation_end(self):
         self.current_sim["duration"] = time.perf_counter() - self.current_sim["start"]
         self.metrics["simulations"].append(self.current_sim)
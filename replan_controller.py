@@ -0,0 +1,118 @@
+import os
+import math
+from collections import deque
+
+from simulation_engine import START_SPEED, END_SPEED, SPEED_STEP, HORIZON
+
+# Parameters
+LATENCY_SLO  = float(os.getenv("SWEEP_LATENCY_SLO", "30"))   # s per recommendation
+MIN_INTERVAL = float(os.getenv("SWEEP_MIN_INTERVAL", "10"))  # s between sweeps
+MAX_INTERVAL = float(os.getenv("SWEEP_MAX_INTERVAL", "300"))  # s between sweeps
+MAX_DUTY     = 0.5     # share of wall time the sweeper may spend sweeping
+HISTORY      = 20      # recent sweeps the latency model is fitted on
+
+# Sweep configurations from full fidelity to the cheapest degraded one:
+# (horizon in s, candidate speed spacing in km/h)
+PLANS = [
+    (HORIZON, SPEED_STEP),
+    (1800.0, 5),
+    (1800.0, 10),
+    (900.0, 10),
+    (900.0, 15),
+    (600.0, 15),
+]
+
+
+def speed_count(speed_step):
+    return len(range(START_SPEED, END_SPEED + 1, speed_step))
+
+
+class ReplanController:
+    """
+    Picks when to sweep and how big the sweep is, so one recommendation
+    fits LATENCY_SLO. Sweep cost is modelled as
+        latency ≈ fixed + cost * rounds * horizon,  rounds = ceil(speeds / workers)
+    where `fixed` is the per-sweep work that does not shrink with the
+    horizon (placement, route files, SUMO start-up, screening, warm state).
+    Both are fitted by least squares over the last HISTORY measured sweeps.
+    """
+
+    def __init__(self, slo=LATENCY_SLO):
+        self.slo = slo
+        self.fixed = None         # wall seconds per sweep
+        self.cost = None          # wall seconds per simulated second per round
+        self.samples = deque(maxlen=HISTORY)  # (rounds * horizon, latency)
+        self.workers = None
+        self.last_latency = 0.0
+        self.overloaded = False
+
+    def _rounds(self, speed_step):
+        workers = self.workers or speed_count(speed_step)
+        return math.ceil(speed_count(speed_step) / workers)
+
+    def predict(self, horizon, speed_step):
+        if self.cost is None:
+            return None
+        return self.fixed + self.cost * self._rounds(speed_step) * horizon
+
+    def plan(self):
+        """
+        Highest-fidelity configuration predicted to fit the SLO,
+        or the cheapest one (overload) if none does.
+        """
+        for horizon, speed_step in PLANS:
+            predicted = self.predict(horizon, speed_step)
+            if predicted is None or predicted <= self.slo:
+                self.overloaded = False
+                return {"horizon": horizon, "speed_step": speed_step,
+                        "predictedLatency": predicted}
+        self.overloaded = True
+        horizon, speed_step = PLANS[-1]
+        return {"horizon": horizon, "speed_step": speed_step,
+                "predictedLatency": self.predict(horizon, speed_step)}
+
+    def record(self, plan, latency, concurrency=None):
+        """
+        Feeds back the measured latency of a sweep run with `plan`.
+        """
+        self.last_latency = latency
+        workers = (concurrency or {}).get("workers")
+        if isinstance(workers, int):
+            self.workers = workers
+        self.samples.append((self._rounds(plan["speed_step"]) * plan["horizon"], latency))
+        self._fit()
+
+    def _fit(self):
+        xs = [x for x, _ in self.samples]
+        ys = [y for _, y in self.samples]
+        if len(set(xs)) < 2:
+            # One sweep size seen so far: the fixed term is not identifiable yet
+            self.fixed, self.cost = 0.0, sum(ys) / sum(xs)
+            return
+        mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+        cost = sum((x - mx) * (y - my) for x, y in self.samples) / sum((x - mx) ** 2 for x in xs)
+        fixed = my - cost * mx
+        # Keep both terms non-negative, refitting the other one alone
+        if cost < 0:
+            fixed, cost = my, 0.0
+        elif fixed < 0:
+            fixed, cost = 0.0, sum(x * y for x, y in self.samples) / sum(x * x for x in xs)
+        self.fixed, self.cost = fixed, cost
+
+    def interval(self, churn):
+        """
+        Seconds until the next periodic sweep.
+        churn – share of the fleet updated since the last sweep (0..1+)
+        More churn means sweeping sooner, but never more often than
+        MAX_DUTY of the wall time allows.
+        """
+        churn = min(max(churn, 0.0), 1.0)
+        interval = MAX_INTERVAL - (MAX_INTERVAL - MIN_INTERVAL) * churn
+        return max(interval, MIN_INTERVAL, self.last_latency / MAX_DUTY)
+
+    def min_gap(self):
+        """
+        Shortest wait between sweeps triggered by requests; requests that
+        arrive meanwhile coalesce instead of queueing.
+        """
+        return max(MIN_INTERVAL, self.last_latency / MAX_DUTY)
@@ -0,0 +1,51 @@
+import gzip
+import hashlib
+import threading
+
+# Distinct request parameter combinations cached per fleet version
+MAX_ENTRIES = 64
+
+
+class ResponseCache:
+    """
+    Serialized responses keyed by request parameters, valid for one fleet
+    version. Entries of older versions are dropped on the first lookup
+    with a newer version, and within a version at most max_entries are
+    kept (oldest dropped first), so clients cannot grow it without bound.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = {}
+
+    def get(self, version, key):
+        with self.lock:
+            if version != self.version:
+                self.version = version
+                self.entries = {}
+            return self.entries.get(key)
+
+    def put(self, version, key, body, status=200):
+        entry = {
+            "body": body,
+            "status": status,
+            "etag": hashlib.md5(body).hexdigest(),
+            "gzip": None,
+        }
+        with self.lock:
+            if version == self.version:
+                self.entries.pop(key, None)
+                while len(self.entries) >= self.max_entries:
+                    # dicts keep insertion order: drop the oldest entry
+                    del self.entries[next(iter(self.entries))]
+                self.entries[key] = entry
+        return entry
+
+    @staticmethod
+    def gzipped(entry):
+        # Compressed lazily, once per entry, only if a client asks for it
+        if entry["gzip"] is None:
+            entry["gzip"] = gzip.compress(entry["body"], compresslevel=6)
+        return entry["gzip"]
@@ -1,23 +1,46 @@
 import os
 import sys
 import socket
+import uuid
+import shutil
+import tempfile
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
 import random
-from concurrent.futures import ProcessPoolExecutor, as_completed
 import traci
-import sumolib
+
+from net_cache import CachedNet, read_net
+from surrogate import WaitingTimeSurrogate, fleet_features
+from sweep_executors import get_executor
+from sweep_profiler import Profile
+from fleet import compact
+from memory_guard import RssWatcher
 
 # Parameters 
 START_SPEED = 15    # km/h
 END_SPEED   = 60    # km/h
 SPEED_STEP  = 5     # km/h 
+HORIZON     = 3600.0  # s
+
+# Screening pass: cheap ranking of all speeds, only the top-k go to full SUMO
+SCREEN_STEP_LENGTH = 1.0    # s (full runs use the 0.1 s of base.sumocfg)
+SCREEN_HORIZON     = 900.0  # s
+SCREEN_MESOSIM     = True
+SCREEN_TOP_K       = 3
+SCREEN_AUDIT_EVERY = 10     # every N-th screened sweep also runs the full sweep
+
+# Learns summed waiting time per speed from every logged sweep
+SURROGATE = WaitingTimeSurrogate()
+
+# Agreement between screen and full sweep, accumulated over audited sweeps
+screen_stats = {"sweeps": 0, "audits": 0, "top1_agree": 0, "topk_hit": 0}
 
 if "SUMO_HOME" not in os.environ:
     sys.exit("Please declare SUMO_HOME")
 
 # Network
 NET_FILE = os.path.abspath(os.path.join(os.getcwd(), "intrare-automatica.net.xml"))
-NET = sumolib.net.readNet(NET_FILE)
+NET = read_net(NET_FILE)  # memory-mapped if `python net_cache.py` was run
 
 def get_free_port():
     s = socket.socket()
@@ -26,7 +49,19 @@ def get_free_port():
     s.close()
     return port
 
+def start_sumo(sumo_cmd, tag="sim"):
+    """
+    Starts SUMO on a TraCI connection of its own and returns it.
+    Sweeps can run concurrently in one process (scheduler and request
+    threads), so the shared "default" connection label is never used.
+    """
+    label = f"{tag}_{uuid.uuid4().hex}"
+    traci.start(sumo_cmd, port=get_free_port(), label=label)
+    return traci.getConnection(label)
+
 def find_nearest_edge(x, y):
+    if isinstance(NET, CachedNet):
+        return NET.getNearestEdge(x, y)
     best_edge = None
     best_d2 = float("inf")
     for edge in NET.getEdges():
@@ -44,96 +79,188 @@ def find_nearest_edge(x, y):
                 best_edge = edge
     return best_edge
 
-def build_route_file(max_speed_kmh, clients):
-    print("SUNT AICIIIII")
-    root = ET.Element("routes")
-    max_speed_mps = max_speed_kmh / 3.6
-
-    # vType
-    ET.SubElement(root, "vType",
-                  id="vehicle", vClass="delivery",
-                  carFollowModel="IDM", accel="2.0", decel="3.0",
-                  tau="1.0", minGap="2.5", maxSpeed=str(max_speed_mps))
-
-    for client in clients:
-        vid = client["id"]
-        lon = float(client["location"]["ox"])
-        lat = float(client["location"]["oy"])
-        x, y = NET.convertLonLat2XY(lon, lat)
-
-        # Find nearest edge
-        nbrs = NET.getNeighboringEdges(x, y)
-        edge_obj = nbrs[0][0] if nbrs else find_nearest_edge(x, y)
-        if edge_obj is None:
-            print(f"⚠️ Skipping {vid}: no nearby edge found!")
+def place_client(vehicle):
+    """
+    Maps a vehicle's lon/lat onto the network.
+    Returns (edge_obj, departPos) or None when no edge is close enough.
+    """
+    x, y = NET.convertLonLat2XY(vehicle.lon, vehicle.lat)
+
+    if isinstance(NET, CachedNet):
+        # Nearest edge and departPos in one pass over the precomputed segments
+        located = NET.locate(x, y)
+        if located is None:
+            return None
+        edge_obj, departPos = located
+        departPos = max(0.0, min(departPos, edge_obj.getLength() - 0.1))
+        return edge_obj, departPos
+
+    # Find nearest edge
+    nbrs = NET.getNeighboringEdges(x, y)
+    edge_obj = nbrs[0][0] if nbrs else find_nearest_edge(x, y)
+    if edge_obj is None:
+        return None
+
+    # Compute accurate departPos
+    shape = edge_obj.getShape()
+    best_d = float("inf")
+    departPos = 0.0
+    s_accum = 0.0
+    for (x1, y1), (x2, y2) in zip(shape, shape[1:]):
+        dx, dy = x2 - x1, y2 - y1
+        seg_len = (dx*dx + dy*dy)**0.5
+        if seg_len < 1e-6:
             continue
+        t = ((x - x1)*dx + (y - y1)*dy) / (seg_len*seg_len)
+        t = max(0.0, min(1.0, t))
+        px, py = x1 + t*dx, y1 + t*dy
+        d = ((x - px)**2 + (y - py)**2)**0.5
+        if d < best_d:
+            best_d = d
+            departPos = s_accum + ((px - x1)**2 + (py - y1)**2)**0.5
+        s_accum += seg_len
+
+    departPos = min(departPos, edge_obj.getLength() - 0.1)
+    if departPos < 0:
+        departPos = 0.0
 
-        entry_edge = edge_obj.getID()
+    return edge_obj, departPos
 
-        # Pick exit edge
-        outs = [e.getID() for e in edge_obj.getToNode().getOutgoing() if e.getID() != entry_edge]
-        exit_edge = random.choice(outs) if outs else entry_edge
+def build_route_file(max_speed_kmh, clients, placements=None, tag="sim", out_dir=None):
+    """
+    clients    – Vehicle objects or vehicle dicts
+    placements – optional list of place_client() results aligned with clients,
+                 so a sweep only maps every vehicle onto the network once
+    tag        – route file prefix (routes_<tag>_<speed>.rou.xml)
+    out_dir    – directory of the route file, results/ by default
 
-        # Compute accurate departPos
-        shape = edge_obj.getShape()
-        best_d = float("inf")
-        departPos = 0.0
-        s_accum = 0.0
-        for (x1, y1), (x2, y2) in zip(shape, shape[1:]):
-            dx, dy = x2 - x1, y2 - y1
-            seg_len = (dx*dx + dy*dy)**0.5
-            if seg_len < 1e-6:
-                continue
-            t = ((x - x1)*dx + (y - y1)*dy) / (seg_len*seg_len)
-            t = max(0.0, min(1.0, t))
-            px, py = x1 + t*dx, y1 + t*dy
-            d = ((x - px)**2 + (y - py)**2)**0.5
-            if d < best_d:
-                best_d = d
-                departPos = s_accum + ((px - x1)**2 + (py - y1)**2)**0.5
-            s_accum += seg_len
-
-        departPos = min(departPos, edge_obj.getLength() - 0.1)
-        if departPos < 0:
-            departPos = 0.0
-
-        # Vehicle depart speed: clipped to both maxSpeed and safe braking distance
-        gps_speed_kmh = float(client["GPSSpeed"])
-        gps_speed_mps = gps_speed_kmh / 3.6
-        desired_speed = min(gps_speed_mps, max_speed_mps)
-
-        rem_len = max(edge_obj.getLength() - departPos, 0.0)
-        decel = 3.0
-        safe_speed = (2 * decel * rem_len) ** 0.5
-
-        depart_speed = min(desired_speed, safe_speed)
-
-        # Write route and vehicle
-        ET.SubElement(root, "route", id=f"route_{vid}", edges=f"{entry_edge} {exit_edge}")
-        ET.SubElement(root, "vehicle",
-                      id=f"veh_{vid}",
-                      type="vehicle",
-                      route=f"route_{vid}",
-                      depart="0",
-                      departPos=f"{departPos:.2f}",
-                      departLane="best",
-                      departSpeed=f"{depart_speed:.2f}")
-
-    # Save
-    results_dir = os.path.abspath(os.path.join(os.getcwd(), "results"))
+    The file is streamed to disk, no DOM is kept for large fleets.
+    """
+    vehicles = compact(clients)
+    max_speed_mps = max_speed_kmh / 3.6
+
+    if placements is None:
+        placements = [place_client(v) for v in vehicles]
+
+    results_dir = out_dir or os.path.abspath(os.path.join(os.getcwd(), "results"))
     os.makedirs(results_dir, exist_ok=True)
-    rou_path = os.path.join(results_dir, f"routes_sim_{max_speed_kmh}.rou.xml")
-    ET.ElementTree(root).write(rou_path, encoding="utf-8", xml_declaration=True)
+    rou_path = os.path.join(results_dir, f"routes_{tag}_{max_speed_kmh}.rou.xml")
+
+    cnt = 0
+    with open(rou_path, "w", encoding="utf-8") as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n<routes>\n")
+        # vType
+        f.write(f'    <vType id="vehicle" vClass="delivery" carFollowModel="IDM" accel="2.0" '
+                f'decel="3.0" tau="1.0" minGap="2.5" maxSpeed="{max_speed_mps}" />\n')
+
+        for vehicle, placement in zip(vehicles, placements):
+            vid = vehicle.id
+            if placement is None:
+                print(f"⚠️ Skipping {vid}: no nearby edge found!")
+                continue
+            edge_obj, departPos = placement
+
+            entry_edge = edge_obj.getID()
+
+            # Pick exit edge
+            outs = [e.getID() for e in edge_obj.getToNode().getOutgoing() if e.getID() != entry_edge]
+            exit_edge = random.choice(outs) if outs else entry_edge
+
+            # Vehicle depart speed: clipped to both maxSpeed and safe braking distance
+            gps_speed_mps = vehicle.gps_speed / 3.6
+            desired_speed = min(gps_speed_mps, max_speed_mps)
+
+            rem_len = max(edge_obj.getLength() - departPos, 0.0)
+            decel = 3.0
+            safe_speed = (2 * decel * rem_len) ** 0.5
+
+            depart_speed = min(desired_speed, safe_speed)
+
+            # Write route and vehicle
+            f.write(f'    <route id={quoteattr(f"route_{vid}")} '
+                    f'edges={quoteattr(f"{entry_edge} {exit_edge}")} />\n')
+            f.write(f'    <vehicle id={quoteattr(f"veh_{vid}")} type="vehicle" '
+                    f'route={quoteattr(f"route_{vid}")} depart="0" departPos="{departPos:.2f}" '
+                    f'departLane="best" departSpeed="{depart_speed:.2f}" />\n')
+            cnt += 1
+
+        f.write("</routes>\n")
 
-    cnt = len(root.findall("vehicle"))
     print(f">>> [DEBUG] Generated {cnt} <vehicle> entries in {rou_path}")
     if cnt == 0:
         print(">>> ⚠️ No vehicles generated!")
 
     return rou_path
 
-def run_single_simulation_route(max_speed, route_file):
-    tripinfo_file = route_file.replace("routes_sim", "tripinfo_sim").replace(".rou.xml", ".xml")
+def build_warm_state(vehicles, placements, out_dir=None):
+    """
+    Loads the network and inserts every vehicle once, then saves the SUMO
+    state so each candidate speed can fork from it instead of repeating the
+    warm-up. Vehicles are built with the highest cap; the per-speed cap and
+    depart speed clipping are applied after loading the state.
+    Returns (state_file, state_time), or None when some vehicles could not
+    be inserted at t=0: their END_SPEED depart speed would stay in the
+    snapshot, so the sweep has to run from cold route files instead.
+    """
+    route_file = build_route_file(END_SPEED, vehicles, placements, tag="warm", out_dir=out_dir)
+    state_file = route_file.replace(".rou.xml", ".state.xml")
+
+    cfg = os.path.abspath(os.path.join(os.getcwd(), "base.sumocfg"))
+    sumo_cmd = [
+        "sumo", "-c", cfg,
+        "--no-warnings", "--no-step-log",
+        "--route-files", route_file,
+    ]
+
+    conn = start_sumo(sumo_cmd, tag="warm")
+    try:
+        # All vehicles depart at t=0: one step inserts the fleet unless
+        # insertion is delayed (blocked lane), which leaves them pending
+        conn.simulationStep()
+        pending = len(conn.simulation.getPendingVehicles())
+        state_time = conn.simulation.getTime()
+        if not pending:
+            conn.simulation.saveState(state_file)
+    finally:
+        conn.close()
+
+    if pending:
+        print(f">>> ♨️ {pending} vehicles not inserted at t=0, warm start skipped")
+        return None
+    print(f">>> ♨️ Saved warm-start state at t={state_time} → {state_file}")
+    return state_file, state_time
+
+def run_single_simulation_route(max_speed, route_file, profile_dir=None, **options):
+    """
+    Runs one speed (see _run_single_simulation_route for the options).
+    profile_dir  – profile this run into the sweep's profile directory:
+                   cProfile, sampled stacks and SUMO's duration statistics
+    """
+    if profile_dir is None:
+        return _run_single_simulation_route(max_speed, route_file, **options)
+    prefix = os.path.join(profile_dir, f"worker_{options.get('tag', 'sim')}_{max_speed}")
+    with Profile(prefix):
+        return _run_single_simulation_route(max_speed, route_file,
+                                            sumo_log=prefix + ".sumo.log", **options)
+
+def _run_single_simulation_route(max_speed, route_file,
+                                 horizon=HORIZON, step_length=None,
+                                 mesosim=False, tag="sim",
+                                 state_file=None, state_time=0.0,
+                                 sumo_log=None):
+    """
+    max_speed    – speed cap of this run (km/h)
+    route_file   – .rou.xml built by build_route_file (ignored with state_file)
+    horizon      – simulated seconds
+    step_length  – override of the base.sumocfg step length
+    mesosim      – run SUMO's mesoscopic model instead of the microscopic one
+    tag          – tripinfo file prefix, keeps screening and full runs apart
+    state_file   – warm-start snapshot from build_warm_state
+    state_time   – simulation time at which state_file was saved
+    sumo_log     – write SUMO messages and --duration-log.statistics here
+    """
+    results_dir = os.path.dirname(os.path.abspath(route_file or state_file))
+    tripinfo_file = os.path.join(results_dir, f"tripinfo_{tag}_{max_speed}.xml")
     # ensure we start from scratch
     if os.path.exists(tripinfo_file):
         os.remove(tripinfo_file)
@@ -142,72 +269,244 @@ def run_single_simulation_route(max_speed, route_file):
     sumo_cmd = [
         "sumo", "-c", cfg,
         "--no-warnings", "--no-step-log",
-        "--route-files", route_file,
         "--tripinfo-output", tripinfo_file,
         "--quit-on-end"
     ]
-
-    port = get_free_port()
-    traci.start(sumo_cmd, port=port)
+    if state_file is not None:
+        sumo_cmd += ["--load-state", state_file, "--begin", str(state_time)]
+    else:
+        sumo_cmd += ["--route-files", route_file]
+    if step_length is not None:
+        sumo_cmd += ["--step-length", str(step_length)]
+    if mesosim:
+        sumo_cmd += ["--mesosim"]
+    if sumo_log is not None:
+        sumo_cmd += ["--duration-log.statistics", "--log", sumo_log]
+    if horizon < HORIZON:
+        # vehicles still on the network at the cut-off must count too
+        sumo_cmd += ["--tripinfo-output.write-unfinished"]
+
+    # Own connection label: broker workers may run several tasks as threads
+    conn = start_sumo(sumo_cmd, tag=tag)
     try:
-        while traci.simulation.getTime() < 3600.0:
-            traci.simulationStep()
+        if state_file is not None:
+            # the snapshot carries the highest cap, only the cap differs per run
+            cap = max_speed / 3.6
+            conn.vehicletype.setMaxSpeed("vehicle", cap)
+            # and vehicles departed at up to END_SPEED: clip them to this cap
+            # right away, as build_route_file does for cold runs
+            for vid in conn.vehicle.getIDList():
+                if conn.vehicle.getSpeed(vid) > cap:
+                    conn.vehicle.setPreviousSpeed(vid, cap)
+        while conn.simulation.getTime() < horizon:
+            conn.simulationStep()
     finally:
-        traci.close()
+        conn.close()
 
-    # Safe‐parse the tripinfo output
-    waiting_times = []
+    # Safe‐parse the tripinfo output, streamed and reduced to aggregates
+    summed_wait = 0.0
     vehicles_arrived = 0
+    # Per entry edge (approach), from the tripinfo departLane:
+    # [summed waiting time, vehicles reported]
+    approach_wait = {}
 
     if not os.path.exists(tripinfo_file):
         print(f"⚠️  No tripinfo output for speed={max_speed} (file missing), skipping parse.")
-        return max_speed, waiting_times, vehicles_arrived
+        return max_speed, summed_wait, vehicles_arrived, approach_wait
 
     try:
-        tree = ET.parse(tripinfo_file)
-        for trip in tree.getroot().findall("tripinfo"):
-            wt = trip.get("waitingTime")
-            if wt:
-                waiting_times.append(float(wt))
+        context = ET.iterparse(tripinfo_file, events=("start", "end"))
+        _, root = next(context)
+        for event, trip in context:
+            if event != "end" or trip.tag != "tripinfo":
+                continue
+            wt = float(trip.get("waitingTime") or 0.0)
+            summed_wait += wt
+            lane = trip.get("departLane")
+            if lane:
+                approach = approach_wait.setdefault(lane.rsplit("_", 1)[0], [0.0, 0])
+                approach[0] += wt
+                approach[1] += 1
             vehicles_arrived += 1
+            # drop the parsed <tripinfo>s from the root, memory stays flat
+            root.clear()
     except ET.ParseError:
         print(f"⚠️  Could not parse {tripinfo_file}, skipping.")
 
-    return max_speed, waiting_times, vehicles_arrived
+    return max_speed, summed_wait, vehicles_arrived, approach_wait
+
+
+def run_sweep(speeds, route_files, executor=None, **sim_kwargs):
+    """
+    Runs one simulation per speed on the sweep executor: a local process pool
+    sized from the container's CPU quota/affinity, or remote workers behind a
+    broker (see sweep_executors).
+    Returns ({speed: summed waiting time}, {speed: vehicles_arrived},
+             {speed: {entry edge: [summed waiting time, vehicles]}}, concurrency).
+    """
+    executor = executor or get_executor()
+    tasks = [dict(sim_kwargs, max_speed=s, route_file=route_files[s]) for s in speeds]
+
+    results = {}
+    throughputs = {}
+    approach_waits = {}
+    outputs, concurrency = executor.run(run_single_simulation_route, tasks)
+    for s, summed_wait, vehicles_arrived, approach_wait in outputs:
+        results[s] = summed_wait
+        throughputs[s] = vehicles_arrived
+        approach_waits[s] = approach_wait
+    return results, throughputs, approach_waits, concurrency
+
+
+def screen_speeds(speeds, route_files, top_k=SCREEN_TOP_K, horizon=SCREEN_HORIZON,
+                  profile_dir=None):
+    """
+    Reduced-fidelity pass (mesoscopic, coarse step, short horizon).
+    Returns all speeds ranked by summed waiting time and the top_k of them.
+    """
+    results, _, _, _ = run_sweep(speeds, route_files,
+                                 horizon=horizon,
+                                 step_length=SCREEN_STEP_LENGTH,
+                                 mesosim=SCREEN_MESOSIM,
+                                 tag="screen",
+                                 profile_dir=profile_dir)
+    ranked = sorted(speeds, key=lambda s: results[s])
+    print(">>> 🔎 Screening ranking: " + ", ".join(f"{s} km/h" for s in ranked))
+    return ranked, ranked[:top_k]
 
 
 def run_simulations(clients,
                     sumo_binary: str = "sumo",
-                    config_file: str = "base.sumocfg"):
+                    config_file: str = "base.sumocfg",
+                    screen: bool = False,
+                    top_k: int = SCREEN_TOP_K,
+                    surrogate_first: bool = False,
+                    warm_start: bool = False,
+                    horizon: float = HORIZON,
+                    speed_step: int = SPEED_STEP,
+                    profile_dir: str = None):
     """
-    clients       – list of vehicle dicts
+    clients       – list of Vehicle objects (fleet.py) or vehicle dicts
     sumo_binary   – "sumo" or "sumo-gui"
     config_file   – .sumocfg path
+    screen        – rank all speeds with a cheap screening pass first and
+                    re-run only the top_k at full fidelity
+    top_k         – number of speeds kept after screening
+    surrogate_first – answer from the surrogate model when it is confident,
+                    otherwise sweep with SUMO (which also retrains it)
+    warm_start    – fork every full-fidelity run from one saved SUMO state
+                    instead of inserting the fleet ten times
+    horizon       – simulated seconds of the full-fidelity runs
+    speed_step    – spacing of the candidate speeds (km/h); larger is cheaper
+    profile_dir   – profile every SUMO worker of this sweep into this directory
     """
-    speeds = list(range(START_SPEED, END_SPEED+1, SPEED_STEP))
+    speeds = list(range(START_SPEED, END_SPEED+1, speed_step))
 
-    # Build all the route files first
-    route_files = {s: build_route_file(s, clients) for s in speeds}
+    vehicles = compact(clients)
 
-    results = {}
-    throughputs = {}
-    with ProcessPoolExecutor(max_workers=len(speeds)) as executor:
-        futures = {
-            executor.submit(run_single_simulation_route, s, route_files[s]): s
-            for s in speeds
-        }
-        for f in as_completed(futures):
-            s, waiting_times, vehicles_arrived = f.result()
-            results[s] = waiting_times
-            throughputs[s] = vehicles_arrived
+    # Map every vehicle onto the network once for the whole sweep
+    placements = [place_client(v) for v in vehicles]
+    features = fleet_features(vehicles, placements)
 
-    summed_wait = {s: sum(results[s]) for s in speeds}
+    if surrogate_first:
+        predicted, confident = SURROGATE.predict(features, speeds)
+        if confident:
+            best = min(predicted, key=lambda s: predicted[s])
+            print(f">>> 🧠 Surrogate recommended speed: {best} km/h\n")
+            return {"recommendedSpeed": f"{best} km/h", "approachSpeeds": {},
+                    "source": "surrogate"}
+        print(">>> 🧠 Surrogate not confident, running SUMO sweep")
+
+    # Route, state and tripinfo files of this sweep only: concurrent sweeps
+    # (scheduler and requests) must not overwrite or delete each other's
+    results_dir = os.path.abspath(os.path.join(os.getcwd(), "results"))
+    os.makedirs(results_dir, exist_ok=True)
+    sweep_dir = tempfile.mkdtemp(prefix="sweep_", dir=results_dir)
+
+    # Peak RSS of the sweep (parent, workers, sumo); also bounds the next pool size
+    try:
+        with RssWatcher(len(vehicles)) as rss:
+            # Build all the route files first (warm-started runs only need them to screen)
+            route_files = {}
+            if screen or not warm_start:
+                route_files = {s: build_route_file(s, vehicles, placements, out_dir=sweep_dir)
+                               for s in speeds}
+
+            audit = False
+            if screen:
+                ranked, candidates = screen_speeds(speeds, route_files, top_k,
+                                                   min(SCREEN_HORIZON, horizon), profile_dir)
+                screen_stats["sweeps"] += 1
+                # Every SCREEN_AUDIT_EVERY-th sweep runs everything to measure agreement
+                audit = (screen_stats["sweeps"] - 1) % SCREEN_AUDIT_EVERY == 0
+                full_speeds = speeds if audit else sorted(candidates)
+            else:
+                full_speeds = speeds
+
+            warm = build_warm_state(vehicles, placements, sweep_dir) if warm_start else None
+            if warm is not None:
+                state_file, state_time = warm
+                results, throughputs, approach_waits, concurrency = run_sweep(
+                    full_speeds, {s: None for s in full_speeds},
+                    horizon=horizon, state_file=state_file, state_time=state_time,
+                    profile_dir=profile_dir)
+            else:
+                for s in full_speeds:
+                    if s not in route_files:
+                        route_files[s] = build_route_file(s, vehicles, placements, out_dir=sweep_dir)
+                results, throughputs, approach_waits, concurrency = run_sweep(
+                    full_speeds, route_files, horizon=horizon, profile_dir=profile_dir)
+    finally:
+        shutil.rmtree(sweep_dir, ignore_errors=True)
+
+    summed_wait = {s: results[s] for s in full_speeds}
     best = min(summed_wait, key=lambda s: summed_wait[s])
 
-    print(f">>> 🚗 Vehicles simulated: {len(clients)}\n")
-    for s in speeds:
+    # Same runs, aggregated per approach: each entry edge gets its own optimum.
+    # Only speeds that report all of an approach's vehicles are compared, a
+    # run where some were not inserted or did not finish would look best.
+    approaches = sorted({e for waits in approach_waits.values() for e in waits})
+    approach_speeds = {}
+    for e in approaches:
+        counts = {s: approach_waits[s].get(e, (0.0, 0))[1] for s in full_speeds}
+        complete = [s for s in full_speeds if counts[s] == max(counts.values())]
+        approach_speeds[e] = f"{min(complete, key=lambda s: approach_waits[s][e][0])} km/h"
+
+    # Only full-hour sweeps over the whole default speed grid are comparable
+    # training data; screened or coarser sweeps leave out candidate speeds
+    if horizon >= HORIZON and full_speeds == list(range(START_SPEED, END_SPEED+1, SPEED_STEP)):
+        SURROGATE.update(features, summed_wait)
+
+    if audit:
+        screen_stats["audits"] += 1
+        screen_stats["top1_agree"] += int(ranked[0] == best)
+        screen_stats["topk_hit"] += int(best in candidates)
+
+    print(f">>> 🚗 Vehicles simulated: {len(vehicles)}\n")
+    for s in full_speeds:
         print(f"🚗 Throughput for {s} km/h: {throughputs[s]} vehicles")
         print(f"🕒 Total waiting time for {s} km/h: {summed_wait[s]:.2f} seconds")
     print(f"\n>>> 🏁 Recommended speed: {best} km/h\n")
-
-    return {"recommendedSpeed": f"{best} km/h"}
+    for e in approaches:
+        print(f"🛣️  Recommended speed for approach {e}: {approach_speeds[e]}")
+
+    sim = {"recommendedSpeed": f"{best} km/h", "approachSpeeds": approach_speeds,
+           "source": "sumo", "concurrency": concurrency, "memory": rss.stats()}
+    if screen:
+        audits = screen_stats["audits"]
+        sim["screening"] = {
+            "ranking": ranked,
+            "candidates": candidates,
+            "audited": audit,
+            # this sweep's outcome, so reports can aggregate across restarts
+            "top1Agree": ranked[0] == best if audit else None,
+            "topKHit": best in candidates if audit else None,
+            "audits": audits,
+            "top1AgreementRate": screen_stats["top1_agree"] / audits if audits else None,
+            "topKHitRate": screen_stats["topk_hit"] / audits if audits else None,
+        }
+        if audits:
+            print(f">>> 🔎 Screen agreement over {audits} audits: "
+                  f"top-1 {sim['screening']['top1AgreementRate']:.0%}, "
+                  f"top-{top_k} {sim['screening']['topKHitRate']:.0%}")
+    return sim
@@ -0,0 +1,167 @@
+import os
+import json
+import math
+import heapq
+import datetime
+from collections import deque
+
+# Parameters
+SURROGATE_LOG   = os.path.abspath(os.path.join(os.getcwd(), "results", "surrogate_log.jsonl"))
+K_NEIGHBOURS    = 5
+MIN_SAMPLES     = 20     # sweeps logged before the surrogate answers at all
+MAX_DISTANCE    = 1.0    # standardized feature distance of the nearest sweep
+MIN_AGREEMENT   = 0.8    # share of neighbours that must agree on the best speed
+MAX_SAMPLES     = 2000   # most recent sweeps kept; the log is compacted to these
+
+
+def fleet_features(vehicles, placements):
+    """
+    Fleet description used as surrogate input:
+    vehicle count per entry edge, GPS speed distribution and depart positions.
+    """
+    features = {"vehicles": float(len(vehicles))}
+
+    speeds = sorted(v.gps_speed for v in vehicles)
+    if speeds:
+        mean = sum(speeds) / len(speeds)
+        features["speed_mean"] = mean
+        features["speed_std"] = (sum((v - mean) ** 2 for v in speeds) / len(speeds)) ** 0.5
+        for q in (10, 50, 90):
+            features[f"speed_p{q}"] = speeds[min(len(speeds) - 1, len(speeds) * q // 100)]
+
+    positions = []
+    for placement in placements:
+        if placement is None:
+            continue
+        edge_obj, depart_pos = placement
+        key = f"edge:{edge_obj.getID()}"
+        features[key] = features.get(key, 0.0) + 1
+        positions.append(depart_pos / max(edge_obj.getLength(), 1e-6))
+    if positions:
+        mean = sum(positions) / len(positions)
+        features["pos_mean"] = mean
+        features["pos_std"] = (sum((p - mean) ** 2 for p in positions) / len(positions)) ** 0.5
+
+    return features
+
+
+class WaitingTimeSurrogate:
+    """
+    k-nearest-neighbour regression over previously logged sweeps.
+    Predicts the summed waiting time per speed from fleet features.
+    """
+
+    def __init__(self, log_path=SURROGATE_LOG, max_samples=MAX_SAMPLES):
+        self.log_path = log_path
+        self.max_samples = max_samples
+        self.samples = None
+        self.scales = {}
+        self.log_lines = 0
+
+    def load(self):
+        self.samples = deque(maxlen=self.max_samples)
+        self.log_lines = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.log_lines += 1
+                    try:
+                        sample = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    sample["summedWait"] = {int(s): w for s, w in sample["summedWait"].items()}
+                    self.samples.append(sample)
+        if self.log_lines > self.max_samples:
+            self._compact()
+        self._fit()
+
+    @staticmethod
+    def _dump(sample):
+        return json.dumps(dict(sample, summedWait={str(s): w for s, w in sample["summedWait"].items()}))
+
+    def _compact(self):
+        # Rewrites the log with the kept window only, atomically
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for sample in self.samples:
+                f.write(self._dump(sample) + "\n")
+        os.replace(tmp_path, self.log_path)
+        self.log_lines = len(self.samples)
+
+    def _fit(self):
+        # Per-feature standard deviation, so edge counts and speeds weigh alike
+        keys = set()
+        for sample in self.samples:
+            keys.update(sample["features"])
+        self.scales = {}
+        n = len(self.samples)
+        for key in keys:
+            values = [sample["features"].get(key, 0.0) for sample in self.samples]
+            mean = sum(values) / n
+            std = (sum((v - mean) ** 2 for v in values) / n) ** 0.5
+            self.scales[key] = std if std > 1e-9 else 1.0
+
+    def _distance(self, a, b):
+        d2 = 0.0
+        for key in set(a) | set(b):
+            scale = self.scales.get(key, 1.0)
+            d2 += ((a.get(key, 0.0) - b.get(key, 0.0)) / scale) ** 2
+        return math.sqrt(d2)
+
+    def predict(self, features, speeds):
+        """
+        Returns ({speed: predicted summed waiting time}, confident).
+        """
+        if self.samples is None:
+            self.load()
+        # Only sweeps that covered every requested speed are comparable
+        comparable = [sample for sample in self.samples
+                      if all(s in sample["summedWait"] for s in speeds)]
+        if len(comparable) < MIN_SAMPLES:
+            return {}, False
+
+        # (distance, sample) of the K nearest sweeps, each distance computed once
+        neighbours = heapq.nsmallest(
+            K_NEIGHBOURS,
+            ((self._distance(features, sample["features"]), sample) for sample in comparable),
+            key=lambda pair: pair[0])
+        nearest = neighbours[0][0]
+
+        predicted = {}
+        for s in speeds:
+            num = den = 0.0
+            for d, sample in neighbours:
+                w = 1.0 / (d + 1e-6)
+                num += w * sample["summedWait"][s]
+                den += w
+            predicted[s] = num / den
+
+        best = min(predicted, key=lambda s: predicted[s])
+        agree = sum(
+            1 for _, sample in neighbours
+            if min(speeds, key=lambda s: sample["summedWait"][s]) == best
+        ) / len(neighbours)
+
+        confident = nearest <= MAX_DISTANCE and agree >= MIN_AGREEMENT
+        return predicted, confident
+
+    def update(self, features, summed_wait):
+        """
+        Logs one real sweep and retrains on it.
+        """
+        sample = {
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "features": features,
+            "summedWait": dict(summed_wait),
+        }
+        if self.samples is None:
+            self.load()
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(self._dump(sample) + "\n")
+        self.log_lines += 1
+
+        self.samples.append(sample)
+        if self.log_lines > 2 * self.max_samples:
+            self._compact()
+        self._fit()
@@ -0,0 +1,308 @@
+import os
+import uuid
+import queue
+import tempfile
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing.managers import BaseManager
+
+import cpu_scheduler
+import memory_guard
+
+# Backend used by run_sweep: "local" (process pool) or "distributed" (broker)
+SWEEP_EXECUTOR = os.getenv("SWEEP_EXECUTOR", "local")
+# Loopback only by default; set e.g. 0.0.0.0:50000 to accept remote workers
+SWEEP_BROKER_ADDR = os.getenv("SWEEP_BROKER_ADDR", "127.0.0.1:50000")
+# Shared secret of broker and workers, required: the broker accepts pickles
+SWEEP_BROKER_AUTHKEY = os.getenv("SWEEP_BROKER_AUTHKEY")
+SWEEP_TASK_TIMEOUT = float(os.getenv("SWEEP_TASK_TIMEOUT", "7200"))  # s
+
+# Keyword arguments that are local file paths and must travel with the task
+FILE_ARGS = ("route_file", "state_file")
+# Keyword arguments that are local output directories: the worker writes into
+# a directory of its own and the files travel back with the result
+OUTPUT_ARGS = ("profile_dir",)
+
+
+class LocalExecutor:
+    """
+    Runs every task in a process pool on this host, sized by cpu_scheduler.
+    While the process tree is over SWEEP_RSS_LIMIT_MB no further task starts
+    until a running one finishes.
+    """
+
+    def run(self, fn, tasks):
+        """
+        tasks – list of kwargs dicts for fn
+        Returns (list of fn results, concurrency info).
+        """
+        workers, cores = cpu_scheduler.BUDGET.acquire(len(tasks))
+        pool_kwargs = {}
+        if cpu_scheduler.PIN_CPUS and cores:
+            pool_kwargs = {"initializer": cpu_scheduler.pin_worker,
+                           "initargs": (cores, multiprocessing.Value("i", 0))}
+        results = []
+        try:
+            with ProcessPoolExecutor(max_workers=workers, **pool_kwargs) as executor:
+                pending = list(tasks)
+                running = set()
+                while pending or running:
+                    while pending and len(running) < workers and \
+                            not (running and memory_guard.over_limit()):
+                        running.add(executor.submit(fn, **pending.pop(0)))
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    results.extend(f.result() for f in done)
+        finally:
+            cpu_scheduler.BUDGET.release(cores)
+        return results, cpu_scheduler.concurrency_info(len(tasks), workers)
+
+
+class InProcessBroker:
+    """
+    Local stand-in for a remote broker: one task queue, one result queue
+    per sweep. Pair it with start_local_workers() in tests or on one host.
+    """
+
+    def __init__(self):
+        self.tasks = queue.Queue()
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def task_queue(self):
+        return self.tasks
+
+    def result_queue(self, name):
+        with self.lock:
+            return self.results.setdefault(name, queue.Queue())
+
+    def drop_result_queue(self, name):
+        with self.lock:
+            self.results.pop(name, None)
+
+    def has_result_queue(self, name):
+        with self.lock:
+            return name in self.results
+
+    def put_result(self, name, reply):
+        """
+        Worker side: posts a reply unless its sweep already gave up
+        (timeout or failed task dropped the queue). Never re-creates it.
+        Returns whether the reply was posted.
+        """
+        with self.lock:
+            results_q = self.results.get(name)
+        if results_q is None:
+            return False
+        results_q.put(reply)
+        return True
+
+
+class ManagerBroker:
+    """
+    Broker served over TCP with multiprocessing managers. The sweeping
+    process hosts it; sweep_worker.py processes on other nodes connect to it.
+    """
+
+    def __init__(self, address=SWEEP_BROKER_ADDR, authkey=SWEEP_BROKER_AUTHKEY, serve=False):
+        if not authkey:
+            raise RuntimeError("Set SWEEP_BROKER_AUTHKEY to use the distributed sweep executor")
+        if isinstance(authkey, str):
+            authkey = authkey.encode()
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.authkey = authkey
+        self.server = None
+        if serve:
+            self.server = _BrokerManager(address=self.address, authkey=authkey)
+            self.server.start()
+        self.manager = _BrokerManager(address=self._client_address(), authkey=authkey)
+        self.manager.connect()
+        self.state = self.manager.state()
+
+    def _client_address(self):
+        host, port = self.address
+        return ("127.0.0.1" if host in ("", "0.0.0.0") else host, port)
+
+    def task_queue(self):
+        return self.manager.task_queue()
+
+    def result_queue(self, name):
+        return self.manager.result_queue(name)
+
+    def drop_result_queue(self, name):
+        self.manager.drop_result_queue(name)
+
+    def has_result_queue(self, name):
+        return self.state.has_result_queue(name)
+
+    def put_result(self, name, reply):
+        return self.state.put_result(name, reply)
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+
+# Server-side state of ManagerBroker, lives in the manager process
+_server_state = InProcessBroker()
+
+
+class _BrokerManager(BaseManager):
+    pass
+
+
+_BrokerManager.register("task_queue", callable=_server_state.task_queue)
+_BrokerManager.register("result_queue", callable=_server_state.result_queue)
+_BrokerManager.register("drop_result_queue", callable=_server_state.drop_result_queue)
+
+
+def _state():
+    return _server_state
+
+
+# Methods called through this proxy return plain values, not proxies
+_BrokerManager.register("state", callable=_state, exposed=("has_result_queue", "put_result"))
+
+
+def pack_task(fn, kwargs, reply_to):
+    """
+    Replaces local file paths by their content and drops local output
+    directories, so a remote worker can run it.
+    """
+    files = {}
+    kwargs = dict(kwargs)
+    for key in FILE_ARGS:
+        path = kwargs.get(key)
+        if path:
+            with open(path, "rb") as f:
+                files[key] = (os.path.basename(path), f.read())
+            kwargs[key] = None
+    outputs = [key for key in OUTPUT_ARGS if kwargs.get(key)]
+    for key in outputs:
+        kwargs[key] = None
+    # Functions travel by name, so the broker never has to import them
+    return {"id": uuid.uuid4().hex, "fn": f"{fn.__module__}:{fn.__name__}",
+            "kwargs": kwargs, "files": files, "outputs": outputs, "reply_to": reply_to}
+
+
+def resolve(name):
+    module, attr = name.split(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def run_task(task, work_dir):
+    """
+    Worker side: writes the shipped files to a task directory under
+    work_dir, runs the task, collects its output directories and removes
+    the task directory again.
+    """
+    with tempfile.TemporaryDirectory(prefix=task["id"], dir=work_dir) as task_dir:
+        kwargs = dict(task["kwargs"])
+        for key, (name, content) in task["files"].items():
+            path = os.path.join(task_dir, name)
+            with open(path, "wb") as f:
+                f.write(content)
+            kwargs[key] = path
+        for key in task.get("outputs", ()):
+            kwargs[key] = os.path.join(task_dir, key)
+            os.makedirs(kwargs[key])
+        try:
+            reply = {"id": task["id"], "result": resolve(task["fn"])(**kwargs)}
+        except Exception as e:
+            reply = {"id": task["id"], "error": f"{type(e).__name__}: {e}"}
+
+        reply["outputs"] = {}
+        for key in task.get("outputs", ()):
+            files = reply["outputs"][key] = {}
+            for name in os.listdir(kwargs[key]):
+                with open(os.path.join(kwargs[key], name), "rb") as f:
+                    files[name] = f.read()
+        return reply
+
+
+def worker_loop(broker, work_dir, stop=None):
+    """
+    Pulls tasks until `stop` is set and posts each result to its sweep's queue.
+    Tasks left behind by a sweep that timed out or failed are skipped.
+    """
+    tasks = broker.task_queue()
+    while stop is None or not stop.is_set():
+        try:
+            task = tasks.get(timeout=1)
+        except queue.Empty:
+            continue
+        if not broker.has_result_queue(task["reply_to"]):
+            continue
+        broker.put_result(task["reply_to"], run_task(task, work_dir))
+
+
+def start_local_workers(broker, count, work_dir):
+    """
+    Starts `count` worker threads against an InProcessBroker. Each SUMO
+    run opens its own TraCI connection, so the threads do not share one.
+    Returns the event that stops them.
+    """
+    stop = threading.Event()
+    for _ in range(count):
+        threading.Thread(target=worker_loop, args=(broker, work_dir, stop), daemon=True).start()
+    return stop
+
+
+class QueueExecutor:
+    """
+    Ships tasks (with their route/state files) through a broker and gathers
+    the results of remote SUMO workers.
+    """
+
+    def __init__(self, broker, timeout=SWEEP_TASK_TIMEOUT):
+        self.broker = broker
+        self.timeout = timeout
+
+    def run(self, fn, tasks):
+        reply_to = uuid.uuid4().hex
+        results_q = self.broker.result_queue(reply_to)
+        task_q = self.broker.task_queue()
+        # Where each task's output directories live on this host
+        destinations = {}
+        for kwargs in tasks:
+            task = pack_task(fn, kwargs, reply_to)
+            destinations[task["id"]] = {key: kwargs[key] for key in task["outputs"]}
+            task_q.put(task)
+
+        results = []
+        try:
+            for _ in tasks:
+                try:
+                    reply = results_q.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise RuntimeError(f"No sweep worker answered within {self.timeout:.0f} s")
+                for key, files in reply.get("outputs", {}).items():
+                    out_dir = destinations[reply["id"]][key]
+                    os.makedirs(out_dir, exist_ok=True)
+                    for name, content in files.items():
+                        with open(os.path.join(out_dir, name), "wb") as f:
+                            f.write(content)
+                if "error" in reply:
+                    raise RuntimeError(f"Sweep task {reply['id']} failed: {reply['error']}")
+                results.append(reply["result"])
+        finally:
+            self.broker.drop_result_queue(reply_to)
+        return results, {"tasks": len(tasks), "workers": "distributed"}
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    Executor selected by SWEEP_EXECUTOR, created once per process.
+    """
+    global _executor
+    if _executor is None:
+        if SWEEP_EXECUTOR == "distributed":
+            _executor = QueueExecutor(ManagerBroker(serve=True))
+        else:
+            _executor = LocalExecutor()
+    return _executor
@@ -0,0 +1,155 @@
+import os
+import sys
+import glob
+import time
+import pstats
+import cProfile
+import datetime
+import threading
+from collections import Counter
+
+# Profile every sweep; one-shot profiling is requested via POST /admin/profile
+SWEEP_PROFILE = os.getenv("SWEEP_PROFILE", "false").lower() == "true"
+SAMPLE_INTERVAL = float(os.getenv("SWEEP_PROFILE_INTERVAL", "0.005"))  # s
+REPORT_TOP = 40
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval and counts the
+    stacks in folded format ("root;caller;callee count"), the input of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    """
+    cProfile plus stack sampling of the current thread, written as
+    <prefix>.prof and <prefix>.folded.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler()
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.prefix), exist_ok=True)
+        self.sampler.start()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # A forked worker inherits the parent's active profiler (3.12+)
+            monitoring = sys.monitoring
+            monitoring.free_tool_id(monitoring.PROFILER_ID)
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+        self.sampler.stop()
+        self.profiler.dump_stats(self.prefix + ".prof")
+        self.sampler.write(self.prefix + ".folded")
+        return False
+
+
+def new_profile_dir(output_dir="results"):
+    stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    return os.path.abspath(os.path.join(output_dir, f"profile_{stamp}"))
+
+
+def merge_report(profile_dir, wall_time=None):
+    """
+    Merges the parent and worker profiles of one sweep:
+      <profile_dir>.prof    – all cProfile stats combined
+      <profile_dir>.folded  – all sampled stacks, prefixed by process
+      <profile_dir>.txt     – top functions and the SUMO duration statistics
+    Returns the report path.
+    """
+    profs = sorted(glob.glob(os.path.join(profile_dir, "*.prof")))
+    report_path = profile_dir + ".txt"
+    if not profs:
+        return None
+
+    stats = pstats.Stats(profs[0])
+    for path in profs[1:]:
+        stats.add(path)
+    stats.dump_stats(profile_dir + ".prof")
+
+    with open(profile_dir + ".folded", "w", encoding="utf-8") as out:
+        for path in sorted(glob.glob(os.path.join(profile_dir, "*.folded"))):
+            process = os.path.basename(path)[:-len(".folded")]
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    out.write(f"{process};{line}")
+
+    with open(report_path, "w", encoding="utf-8") as report:
+        report.write(f"Sweep profile {os.path.basename(profile_dir)}\n")
+        if wall_time is not None:
+            report.write(f"Wall time: {wall_time:.2f} s\n")
+        report.write(f"Processes: {', '.join(os.path.basename(p)[:-5] for p in profs)}\n\n")
+
+        stats.stream = report
+        stats.sort_stats("cumulative").print_stats(REPORT_TOP)
+
+        for log in sorted(glob.glob(os.path.join(profile_dir, "*.sumo.log"))):
+            report.write(f"\n=== SUMO {os.path.basename(log)[:-len('.sumo.log')]} ===\n")
+            with open(log, encoding="utf-8", errors="replace") as f:
+                report.write(f.read())
+
+    return report_path
+
+
+class SweepProfile:
+    """
+    Profiles the calling process for one sweep and merges the worker
+    profiles written into the same directory when it ends.
+    """
+
+    def __init__(self, output_dir="results"):
+        self.dir = new_profile_dir(output_dir)
+        self.profile = Profile(os.path.join(self.dir, "parent"))
+        self.report = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.profile.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.__exit__(*exc)
+        self.report = merge_report(self.dir, time.perf_counter() - self.start)
+        if self.report:
+            print(f">>> 🔬 Sweep profile written to {self.report}")
+        return False
@@ -0,0 +1,31 @@
+import os
+import time
+
+# This process owns the sweeps, the HTTP workers only queue them
+os.environ["SWEEP_MODE"] = "dedicated"
+
+from headless import (sweep_lease, controller, last_sweep, fleet_churn,
+                      planned_run, take_sweep_request)
+
+# Parameters
+POLL_INTERVAL = float(os.getenv("SWEEP_POLL", "1"))  # s, checks for queued sweeps
+
+def main():
+    print(f"*** RUNNING sweep_service.py — latency SLO {controller.slo:.0f} s ***")
+    while True:
+        # Several replicas may run; the Mongo lease elects the one that sweeps
+        if not sweep_lease.acquire():
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        since = time.monotonic() - last_sweep["time"]
+
+        # Requests arriving faster than sweeps complete stay flagged and coalesce
+        requested = since >= controller.min_gap() and take_sweep_request()
+        if requested or since >= controller.interval(fleet_churn()):
+            planned_run("POST_updateVehicle" if requested else "scheduled_run", lease=sweep_lease)
+        else:
+            time.sleep(POLL_INTERVAL)
+
+if __name__ == "__main__":
+    main()
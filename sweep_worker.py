@@ -0,0 +1,19 @@
+import os
+import sys
+
+from sweep_executors import ManagerBroker, worker_loop
+
+# Remote SUMO worker: connects to the sweep broker and runs speed simulations.
+# Usage: SWEEP_BROKER_AUTHKEY=<secret> python sweep_worker.py <broker_host:port>
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python sweep_worker.py <broker_host:port>")
+        sys.exit(1)
+
+    broker = ManagerBroker(sys.argv[1])
+    work_dir = os.path.abspath(os.path.join(os.getcwd(), "results", "worker"))
+    os.makedirs(work_dir, exist_ok=True)
+
+    print(f"[WORKER] Connected to sweep broker at {sys.argv[1]}")
+    worker_loop(broker, work_dir)